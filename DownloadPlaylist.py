@@ -1,8 +1,6 @@
 import tekore as tk
 import os
 from dotenv import load_dotenv
-import yt_dlp as youtube_dl
-import eyed3
 import urllib.request
 import re
 import platform
@@ -12,6 +10,13 @@ from flask_cors import CORS
 import zipfile
 import sys
 import uuid
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext, redirect_stdout
 from typing import Dict, Any, Tuple
 
 app = Flask(__name__)
@@ -26,11 +31,36 @@ SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
 # Global variable to track download progress
 download_progress = {}
 
+# Download stack (yt_dlp, eyed3) - imported on first download so API-only
+# processes and health checks don't pay its import time and memory
+_download_stack = None
+
+def _load_download_stack():
+    """Import yt_dlp and eyed3 on first use and return them as (youtube_dl, eyed3)"""
+    global _download_stack
+    if _download_stack is None:
+        import yt_dlp as youtube_dl
+        import eyed3
+        _download_stack = (youtube_dl, eyed3)
+    return _download_stack
+
 def initialize_spotify_client():
     """Initialize Spotify client with client credentials flow"""
     app_token = tk.request_client_token(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET)
     return tk.Spotify(app_token)
 
+# Shared client for search requests, its client token refreshes itself
+_search_client = None
+_search_client_lock = threading.Lock()
+
+def get_search_client():
+    """Return the shared Spotify client used by search, created on first use"""
+    global _search_client
+    with _search_client_lock:
+        if _search_client is None:
+            _search_client = initialize_spotify_client()
+        return _search_client
+
 #############################################################################
 
 def extract_spotify_id(spotify_link: str) -> Tuple[str, str]:
@@ -56,29 +86,98 @@ def extract_spotify_id(spotify_link: str) -> Tuple[str, str]:
     
     raise ValueError("Invalid Spotify link format. Please provide a valid Spotify playlist, album, or track link.")
 
+class TrackRecord(object):
+    """Slim track record holding only the fields the downloader and API responses use"""
+    __slots__ = ('id', 'name', 'artists', 'album', 'album_artist', 'art_url', 'duration_ms',
+                 'track_number', 'disc_number', 'explicit', 'popularity', 'preview_url', 'uri')
+
+    def __init__(self, id, name, artists, album, album_artist, art_url, duration_ms,
+                 track_number, disc_number, explicit=False, popularity=0, preview_url=None, uri=None):
+        self.id = id
+        self.name = name
+        self.artists = artists
+        self.album = album
+        self.album_artist = album_artist
+        self.art_url = art_url
+        self.duration_ms = duration_ms
+        self.track_number = track_number
+        self.disc_number = disc_number
+        self.explicit = explicit
+        self.popularity = popularity
+        self.preview_url = preview_url
+        self.uri = uri
+
+def make_track_record(track, album_info: Dict[str, Any] = None) -> TrackRecord:
+    """Build a TrackRecord from a tekore track, album tracks take album fields from album_info"""
+    album = getattr(track, 'album', None)
+    if album is not None:
+        album_name = album.name
+        album_artist = album.artists[0].name if album.artists else None
+        art_url = album.images[0].url if album.images else None
+    elif album_info:
+        album_name = album_info['name']
+        album_artist = album_info['artists'][0] if album_info['artists'] else None
+        art_url = album_info.get('image')
+    else:
+        album_name = album_artist = art_url = None
+
+    return TrackRecord(
+        id=track.id,
+        name=track.name,
+        artists=tuple(artist.name for artist in track.artists),
+        album=album_name,
+        album_artist=album_artist,
+        art_url=art_url,
+        duration_ms=track.duration_ms,
+        track_number=track.track_number,
+        disc_number=track.disc_number,
+        explicit=track.explicit,
+        popularity=getattr(track, 'popularity', 0),  # Not available in album tracks response
+        preview_url=track.preview_url,
+        uri=track.uri
+    )
+
+def track_to_dict(track: TrackRecord, track_type: str) -> Dict[str, Any]:
+    """Convert a TrackRecord to dict format for JSON responses"""
+    return {
+        'id': track.id,
+        'name': track.name,
+        'artists': list(track.artists),
+        'artist_names': ', '.join(track.artists),
+        'album': track.album,
+        'duration_ms': track.duration_ms,
+        'track_number': track.track_number,
+        'disc_number': track.disc_number,
+        'explicit': track.explicit,
+        'popularity': track.popularity,
+        'preview_url': track.preview_url,
+        'external_urls': {'spotify': f'https://open.spotify.com/track/{track.id}'} if track.id else {},
+        'uri': track.uri,
+        'type': track_type
+    }
+
 def get_playlist_tracks(spotify, playlist_id: str) -> list:
-    """Get all tracks from a playlist"""
+    """Get all tracks from a playlist as TrackRecords, built as each page comes in"""
     tracks = []
     results = spotify.playlist_items(playlist_id)
     
     while results:
         for item in results.items:
             if item.track and item.track.type == 'track':
-                track = item.track
-                tracks.append(track)  # Return the actual track object, not a dict
+                tracks.append(make_track_record(item.track))
         results = spotify.next(results) if results.next else None
     
     return tracks
 
-def get_album_tracks(spotify, album_id: str) -> list:
-    """Get all tracks from an album"""
+def get_album_tracks(spotify, album_id: str, album_info: Dict[str, Any] = None) -> list:
+    """Get all tracks from an album as TrackRecords, built as each page comes in"""
     tracks = []
     results = spotify.album_tracks(album_id)
     
     while results:
         for track in results.items:
             if track.type == 'track':
-                tracks.append(track)  # Return the actual track object, not a dict
+                tracks.append(make_track_record(track, album_info))
         results = spotify.next(results) if results.next else None
     
     return tracks
@@ -104,9 +203,115 @@ def get_album_info(spotify, album_id: str) -> Dict[str, Any]:
         'artists': [artist.name for artist in album.artists],
         'release_date': album.release_date,
         'total_tracks': album.total_tracks,
+        'image': album.images[0].url if album.images else None,
         'type': 'album'
     }
 
+###########################################################################
+# Search results cache
+
+SEARCH_TYPES = ('playlist', 'album', 'track', 'artist')
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 60))  # seconds
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 512))
+SEARCH_WAIT_TIMEOUT = float(os.getenv('SEARCH_WAIT_TIMEOUT', 30))  # seconds a caller waits on an identical search
+
+class SearchCache(object):
+    """Thread-safe LRU cache with a TTL that coalesces identical concurrent lookups"""
+    def __init__(self, maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, wait_timeout=SEARCH_WAIT_TIMEOUT):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.pending = {}  # key -> Future for lookups in flight
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, or compute it once for all concurrent callers"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return entry[1]
+                del self.entries[key]
+
+            future = self.pending.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.pending[key] = future
+
+        # Someone else is already fetching this key, wait (bounded) for their result
+        if not is_owner:
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except FutureTimeoutError:
+                raise TimeoutError('Timed out waiting for an identical search in progress')
+
+        try:
+            value = compute()
+            with self.lock:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            # Failures are not cached, waiting callers get the same error
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+            # compute() was interrupted by a BaseException (e.g. KeyboardInterrupt),
+            # don't leave waiters blocked on a future nobody will resolve
+            if not future.done():
+                future.set_exception(RuntimeError('Search was interrupted'))
+
+search_cache = SearchCache()
+
+def search_item_to_dict(item, item_type: str) -> Dict[str, Any]:
+    """Trim a tekore search result to the fields the search UI needs"""
+    images = None
+    total_tracks = None
+    if item_type == 'playlist':
+        artists = [item.owner.display_name or item.owner.id]
+        images = item.images
+        total_tracks = item.tracks.total
+    elif item_type == 'album':
+        artists = [artist.name for artist in item.artists]
+        images = item.images
+        total_tracks = item.total_tracks
+    elif item_type == 'track':
+        artists = [artist.name for artist in item.artists]
+        images = item.album.images
+    else:
+        artists = [item.name]
+        images = item.images
+
+    return {
+        'id': item.id,
+        'name': item.name,
+        'type': item_type,
+        'artists': artists,
+        'image': images[-1].url if images else None,  # Smallest image, enough for thumbnails
+        'total_tracks': total_tracks
+    }
+
+def search_spotify_items(query: str, types: Tuple[str, ...], limit: int) -> list:
+    """Search Spotify for several item types at once and return trimmed results"""
+    pagings = get_search_client().search(query, types=types, limit=limit)
+    results = []
+    # tekore returns the pagings in the order of Spotify's response, not of `types`,
+    # so take the type from each item instead of zipping with the request
+    for paging in pagings:
+        # Spotify can return null entries in playlist search results
+        results.extend(search_item_to_dict(item, item.type) for item in paging.items if item is not None)
+    # Group by type in the order of `types`, whatever order Spotify used
+    results.sort(key=lambda result: types.index(result['type']))
+    return results
+
 ###########################################################################
 # Flask Routes search playlists
 
@@ -141,69 +346,27 @@ def get_spotify_item():
             playlist_info = get_playlist_info(spotify, item_id)
             tracks = get_playlist_tracks(spotify, item_id)
             
-            # Convert tracks to dict format for JSON response
-            tracks_dict = []
-            for track in tracks:
-                artists = [artist.name for artist in track.artists]
-                tracks_dict.append({
-                    'id': track.id,
-                    'name': track.name,
-                    'artists': artists,
-                    'artist_names': ', '.join(artists),
-                    'album': track.album.name,
-                    'duration_ms': track.duration_ms,
-                    'track_number': track.track_number,
-                    'disc_number': track.disc_number,
-                    'explicit': track.explicit,
-                    'popularity': track.popularity,
-                    'preview_url': track.preview_url,
-                    'external_urls': track.external_urls,
-                    'uri': track.uri,
-                    'type': 'playlist_track'
-                })
-            
             result = {
                 'success': True,
                 'item_info': playlist_info,
-                'tracks': tracks_dict
+                'tracks': [track_to_dict(track, 'playlist_track') for track in tracks]
             }
         
         elif item_type == 'album':
             # Get album info and tracks
             album_info = get_album_info(spotify, item_id)
-            tracks = get_album_tracks(spotify, item_id)
-            
-            # Convert tracks to dict format for JSON response
-            tracks_dict = []
-            for track in tracks:
-                artists = [artist.name for artist in track.artists]
-                tracks_dict.append({
-                    'id': track.id,
-                    'name': track.name,
-                    'artists': artists,
-                    'artist_names': ', '.join(artists),
-                    'album': album_info['name'],  # Use album name from album info
-                    'duration_ms': track.duration_ms,
-                    'track_number': track.track_number,
-                    'disc_number': track.disc_number,
-                    'explicit': track.explicit,
-                    'popularity': 0,  # Not available in album tracks response
-                    'preview_url': track.preview_url,
-                    'external_urls': track.external_urls,
-                    'uri': track.uri,
-                    'type': 'album_track'
-                })
+            tracks = get_album_tracks(spotify, item_id, album_info)
             
             result = {
                 'success': True,
                 'item_info': album_info,
-                'tracks': tracks_dict
+                'tracks': [track_to_dict(track, 'album_track') for track in tracks]
             }
         
         elif item_type == 'track':
             # Handle single track
-            track = spotify.track(item_id)
-            artists = [artist.name for artist in track.artists]
+            track = make_track_record(spotify.track(item_id))
+            artists = list(track.artists)
             result = {
                 'success': True,
                 'item_info': {
@@ -217,7 +380,7 @@ def get_spotify_item():
                     'name': track.name,
                     'artists': artists,
                     'artist_names': ', '.join(artists),
-                    'album': track.album.name,
+                    'album': track.album,
                     'duration_ms': track.duration_ms,
                     'explicit': track.explicit,
                     'popularity': track.popularity,
@@ -247,11 +410,10 @@ def get_spotify_item():
 
 @app.route('/api/spotify/search', methods=['GET'])
 def search_spotify():
-    """Search for playlists, albums, or tracks"""
+    """Search for playlists, albums, tracks or artists, several types can be comma separated"""
     try:
-        query = request.args.get('q')
-        search_type = request.args.get('type', 'playlist')  # playlist, album, track
-        limit = int(request.args.get('limit', 10))
+        query = ' '.join(request.args.get('q', '').split())
+        search_type = request.args.get('type', 'playlist')  # playlist, album, track, artist or e.g. album,track
         
         if not query:
             return jsonify({
@@ -259,14 +421,36 @@ def search_spotify():
                 'error': 'Missing search query parameter "q"'
             }), 400
         
-        spotify = initialize_spotify_client()
-        results = spotify.search(query, types=(search_type,), limit=limit)
+        # De-duplicated types in the order the caller asked for them
+        requested_types = tuple(dict.fromkeys(t.strip() for t in search_type.split(',') if t.strip()))
+        # Sorted for the cache key, so album,track and track,album share an entry
+        types = tuple(sorted(requested_types))
+        invalid_types = [t for t in types if t not in SEARCH_TYPES]
+        if not types or invalid_types:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid search type: {search_type}. Use {", ".join(SEARCH_TYPES)}'
+            }), 400
+        
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parameter "limit" must be a number'
+            }), 400
+        
+        # Case-insensitive key, Spotify search ignores case anyway
+        key = (query.lower(), types, limit)
+        results = search_cache.get_or_compute(key, lambda: search_spotify_items(query, types, limit))
+        # The cached list is shared, return a copy grouped in the requested type order
+        results = sorted(results, key=lambda result: requested_types.index(result['type']))
         
         return jsonify({
             'success': True,
             'query': query,
             'type': search_type,
-            'results': getattr(results, f'{search_type}s').items
+            'results': results
         })
         
     except Exception as e:
@@ -351,16 +535,19 @@ class MyLogger(object):
             log_progress(self.download_id, f"Error: {msg}", "error")
         print(f"ERROR: {msg}")
 
-def get_ydl_opts(download_id, output_template):
+# Audio formats supported by the FFmpegExtractAudio postprocessor that we expose
+AUDIO_FORMATS = ('mp3', 'm4a', 'opus', 'flac')
+
+def get_ydl_opts(download_id, output_template, audio_format='mp3'):
     """Get youtube-dl options with progress tracking"""
     return {
         'format': 'bestaudio/best',
         'extractaudio': True,
-        'outtmpl': '%(title)s.%(ext)s',
+        'outtmpl': output_template,
         'addmetadata': True,
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
+            'preferredcodec': audio_format,
             'preferredquality': '320',
         }],
         'logger': MyLogger(download_id=download_id),
@@ -398,13 +585,15 @@ def get_ydl_opts(download_id, output_template):
         'throttledratelimit': 1000000,  # 1 MB/s when throttled
     }
 
-def check_permissions():
-    """Check if we have write permissions in current directory"""
+def check_permissions(folder=None):
+    """Check if we have write permissions in folder (current directory by default)"""
     try:
-        test_file = "permission_test.txt"
+        test_file = os.path.join(folder or '.', "permission_test.txt")
         with open(test_file, 'w') as f:
             f.write("test")
-        #os.remove(test_file)
+        if folder:
+            # Don't leave the test file behind in a chosen output folder
+            os.remove(test_file)
         return True
     except Exception as e:
         return False
@@ -451,116 +640,170 @@ def sanitize_filename(filename):
         # Fallback to 'unknown' if Unicode fails
         return "unknown"
 
-def songs_downloader(download_id, folder, tracks):
-    """Download songs with progress tracking"""
-    if not check_permissions():
-        log_progress(download_id, "No write permissions in current directory", "error")
-        return
-        
-    download_folder = get_default_download_folder()
-    folder = sanitize_filename(folder)
-    playlist_folder = os.path.join(download_folder, folder)
-    
-    # Create main folder
-    os.makedirs(playlist_folder, exist_ok=True)
-    
-    total_tracks = len(tracks)
-    
-    for i, track in enumerate(tracks, 1):
+def clear_ydl_cache(download_id=None):
+    """Remove yt-dlp's cache directory, once per job or batch (not per track, concurrent removals race)"""
+    youtube_dl, eyed3 = _load_download_stack()
+    try:
+        with youtube_dl.YoutubeDL({'quiet': True, 'logger': MyLogger(download_id=download_id)}) as ydl:
+            ydl.cache.remove()
+    except Exception as e:
+        # A stale cache only costs a slower first extraction, never fail the download for it
+        if download_id:
+            log_progress(download_id, f"Could not clear yt-dlp cache: {e}", "warning")
+
+def download_track(download_id, i, total_tracks, track, playlist_folder, audio_format='mp3', destination_lock=None):
+    """Download and tag a single track, returns 'downloaded', 'existing' or 'failed'"""
+    youtube_dl, eyed3 = _load_download_stack()
+
+    try:
+        # Use safe default names initially
+        song = "unknown_audio"
+        artist = "unknown_artist" 
+        album = "unknown_album"
+
         try:
-            # Use safe default names initially
-            song = "unknown_audio"
-            artist = "unknown_artist" 
-            album = "unknown_album"
-            
-            try:
-                # Try to get the actual names from track object
-                song = track.name
-                artist = track.artists[0].name if track.artists else "unknown_artist"
-                album = track.album.name if hasattr(track, 'album') and track.album else "unknown_album"
-                
-                # Log the original track info
-                log_progress(download_id, f"Track {i}/{total_tracks}: {song} by {artist}", "info")
-                
-            except (UnicodeEncodeError, UnicodeDecodeError) as e:
-                log_progress(download_id, f"Unicode error reading track metadata, using default names", "warning")
-                # Keep the default "unknown" names we set above
-            except Exception as e:
-                log_progress(download_id, f"Error reading track metadata: {e}, using default names", "warning")
-            
-            # Sanitize names (this will handle Unicode errors and return "unknown" if needed)
-            song_safe = sanitize_filename(song)
-            artist_safe = sanitize_filename(artist)
-            album_safe = sanitize_filename(album)
-            
-            # Build the destination path
-            file_name = f'{artist_safe} - {song_safe}.mp3'
-            full_destination = os.path.join(playlist_folder, file_name)
+            # Try to get the actual names from track record
+            song = track.name
+            artist = track.artists[0] if track.artists else "unknown_artist"
+            album = track.album or "unknown_album"
+
+            # Log the original track info
+            log_progress(download_id, f"Track {i}/{total_tracks}: {song} by {artist}", "info")
+
+        except (UnicodeEncodeError, UnicodeDecodeError) as e:
+            log_progress(download_id, f"Unicode error reading track metadata, using default names", "warning")
+            # Keep the default "unknown" names we set above
+        except Exception as e:
+            log_progress(download_id, f"Error reading track metadata: {e}, using default names", "warning")
 
+        # Sanitize names (this will handle Unicode errors and return "unknown" if needed)
+        song_safe = sanitize_filename(song)
+        artist_safe = sanitize_filename(artist)
+        album_safe = sanitize_filename(album)
+
+        # Build the destination path
+        file_name = f'{artist_safe} - {song_safe}.{audio_format}'
+        full_destination = os.path.join(playlist_folder, file_name)
+
+        # Duplicate tracks share a destination; hold its lock so only one copy downloads
+        # and the others find the file and report it as existing
+        with (destination_lock(full_destination) if destination_lock else nullcontext()):
             # Download song if not already downloaded
             if not os.path.exists(full_destination):
                 # Update output template for current download
-                current_ydl_opts = get_ydl_opts(download_id, os.path.join(playlist_folder, f'{artist_safe} - {song_safe}.%(ext)s'))
-                
+                current_ydl_opts = get_ydl_opts(download_id, os.path.join(playlist_folder, f'{artist_safe} - {song_safe}.%(ext)s'), audio_format)
+
                 try:
                     with youtube_dl.YoutubeDL(current_ydl_opts) as ydl:
                         # Use safe names for search query too
                         search_query = f'{song_safe} {artist_safe} official audio'
-                        ydl.cache.remove()
                         ydl.download([f'ytsearch1:{search_query}'])
 
                     # Check if file was downloaded to the destination
                     if os.path.exists(full_destination):
                         log_progress(download_id, f'Successfully downloaded: {file_name}', "success")
-                        
-                        # Add metadata to the downloaded file
-                        try:
-                            audiofile = eyed3.load(full_destination)
-                            if audiofile.tag is None:
-                                audiofile.initTag()
-                            
-                            # Use safe names for metadata too
-                            audiofile.tag.artist = artist_safe
-                            audiofile.tag.title = song_safe
-                            audiofile.tag.album = album_safe
-                            
-                            if hasattr(track, 'album') and track.album and hasattr(track.album, 'artists') and track.album.artists:
-                                try:
-                                    album_artist = track.album.artists[0].name
-                                    audiofile.tag.album_artist = sanitize_filename(album_artist)
-                                except (UnicodeEncodeError, UnicodeDecodeError):
-                                    audiofile.tag.album_artist = "unknown_artist"
-
-                            if hasattr(track, 'track_number'):
-                                audiofile.tag.track_num = track.track_number
-
-                            # Add album art if available
-                            if (hasattr(track, 'album') and track.album and 
-                                hasattr(track.album, 'images') and track.album.images):
-                                try:
-                                    imagedata = urllib.request.urlopen(track.album.images[0].url).read()
-                                    audiofile.tag.images.set(3, imagedata, 'image/jpeg')
-                                except:
-                                    log_progress(download_id, "Could not add album art", "warning")
-
-                            audiofile.tag.save()
-                        except Exception as e:
-                            log_progress(download_id, f"Error adding metadata: {e}", "error")
+
+                        # Add metadata to the downloaded file (eyed3 only handles ID3/mp3)
+                        if audio_format == 'mp3':
+                            try:
+                                audiofile = eyed3.load(full_destination)
+                                if audiofile.tag is None:
+                                    audiofile.initTag()
+
+                                # Use safe names for metadata too
+                                audiofile.tag.artist = artist_safe
+                                audiofile.tag.title = song_safe
+                                audiofile.tag.album = album_safe
+
+                                if track.album_artist:
+                                    try:
+                                        audiofile.tag.album_artist = sanitize_filename(track.album_artist)
+                                    except (UnicodeEncodeError, UnicodeDecodeError):
+                                        audiofile.tag.album_artist = "unknown_artist"
+
+                                if track.track_number:
+                                    audiofile.tag.track_num = track.track_number
+
+                                # Add album art if available
+                                if track.art_url:
+                                    try:
+                                        imagedata = urllib.request.urlopen(track.art_url).read()
+                                        audiofile.tag.images.set(3, imagedata, 'image/jpeg')
+                                    except:
+                                        log_progress(download_id, "Could not add album art", "warning")
+
+                                audiofile.tag.save()
+                            except Exception as e:
+                                log_progress(download_id, f"Error adding metadata: {e}", "error")
+
+                        return 'downloaded'
                     else:
                         log_progress(download_id, f'Failed to download {file_name}', "error")
-                        
+                        return 'failed'
+
                 except youtube_dl.utils.DownloadError as e:
                     log_progress(download_id, f"Error downloading track {i}: {e}. Skipping this song.", "error")
-                    continue
+                    return 'failed'
                 except Exception as e:
                     log_progress(download_id, f"An unexpected error occurred while downloading track {i}: {e}. Skipping this song.", "error")
-                    continue
+                    return 'failed'
             else:
                 log_progress(download_id, f'Already downloaded: {file_name}', "info")
-                
-        except Exception as e:
-            log_progress(download_id, f"Error processing track {i}: {e}", "error")
-            continue
+                return 'existing'
+
+    except Exception as e:
+        log_progress(download_id, f"Error processing track {i}: {e}", "error")
+        return 'failed'
+
+def songs_downloader(download_id, folder, tracks, download_folder=None, audio_format='mp3', on_track=None, executor=None):
+    """Download songs with progress tracking (on executor if given), returns counts of downloaded/existing/failed tracks"""
+    stats = {'downloaded': 0, 'existing': 0, 'failed': 0}
+    stats_lock = threading.Lock()
+
+    def record(status):
+        with stats_lock:
+            stats[status] += 1
+        if on_track:
+            on_track(status)
+
+    if not check_permissions(download_folder):
+        log_progress(download_id, f"No write permissions in {download_folder or 'current directory'}", "error")
+        for track in tracks:
+            record('failed')
+        return stats
+        
+    download_folder = download_folder or get_default_download_folder()
+    folder = sanitize_filename(folder)
+    playlist_folder = os.path.join(download_folder, folder)
+    
+    # Create main folder
+    os.makedirs(playlist_folder, exist_ok=True)
+    
+    total_tracks = len(tracks)
+
+    # One lock per destination file, created on demand
+    destination_locks = {}
+    destination_locks_lock = threading.Lock()
+
+    def destination_lock(path):
+        with destination_locks_lock:
+            return destination_locks.setdefault(path, threading.Lock())
+
+    def process(i, track):
+        record(download_track(download_id, i, total_tracks, track, playlist_folder, audio_format, destination_lock))
+
+    # With an executor the caller owns the pool and clears the yt-dlp cache before starting it
+    if executor is None:
+        clear_ydl_cache(download_id)
+        for i, track in enumerate(tracks, 1):
+            process(i, track)
+    else:
+        # Spread the tracks over the shared pool, so one big playlist uses every worker
+        futures = [executor.submit(process, i, track) for i, track in enumerate(tracks, 1)]
+        for future in futures:
+            future.result()
+
+    return stats
 
 @app.route('/api/download/progress/<download_id>', methods=['GET'])
 def get_download_progress(download_id: str):
@@ -590,7 +833,6 @@ def start_download():
         download_progress[download_id] = []
         
         # Start download in background thread
-        import threading
         thread = threading.Thread(
             target=download_worker,
             args=(download_id, spotify_input)
@@ -610,11 +852,21 @@ def start_download():
             'error': f'Failed to start download: {str(e)}'
         }), 500
 
-def download_worker(download_id, spotify_input):
-    """Worker function to handle download in background"""
+def download_worker(download_id, spotify_input, download_folder=None, audio_format='mp3', on_track=None, spotify=None, executor=None):
+    """Worker function to handle download in background, returns a summary of the job"""
+    summary = {
+        'download_id': download_id,
+        'url': spotify_input,
+        'folder': None,
+        'tracks': 0,
+        'downloaded': 0,
+        'existing': 0,
+        'failed': 0,
+        'error': None
+    }
     try:
         # Initialize Spotify client
-        spotify = initialize_spotify_client()
+        spotify = spotify or initialize_spotify_client()
         
         # Extract ID and type
         item_id, item_type = extract_spotify_id(spotify_input)
@@ -625,7 +877,7 @@ def download_worker(download_id, spotify_input):
         if item_type == 'playlist':
             # Get playlist info and tracks
             playlist_info = get_playlist_info(spotify, item_id)
-            tracks = get_playlist_tracks(spotify, item_id)  # Returns track objects
+            tracks = get_playlist_tracks(spotify, item_id)  # Returns TrackRecords
             folder_name = f"Playlist - {playlist_info['name']}"
             
             log_progress(download_id, f"Downloading playlist: {playlist_info['name']} ({len(tracks)} tracks)", "info")
@@ -633,27 +885,30 @@ def download_worker(download_id, spotify_input):
         elif item_type == 'album':
             # Get album info and tracks
             album_info = get_album_info(spotify, item_id)
-            tracks = get_album_tracks(spotify, item_id)  # Returns track objects
+            tracks = get_album_tracks(spotify, item_id, album_info)  # Returns TrackRecords
             folder_name = f"Album - {album_info['name']} - {', '.join(album_info['artists'])}"
             log_progress(download_id, f"Downloading album: {album_info['name']} by {', '.join(album_info['artists'])} ({len(tracks)} tracks)", "info")
             
         elif item_type == 'track':
             # Handle single track
-            track = spotify.track(item_id)
-            tracks = [track]  # Single track object
-            folder_name = f"Single - {track.name} - {track.artists[0].name}"
-            log_progress(download_id, f"Downloading single track: {track.name} by {track.artists[0].name}", "info")
+            track = make_track_record(spotify.track(item_id))
+            tracks = [track]  # Single TrackRecord
+            folder_name = f"Single - {track.name} - {track.artists[0]}"
+            log_progress(download_id, f"Downloading single track: {track.name} by {track.artists[0]}", "info")
         
         else:
             log_progress(download_id, "Unknown item type", "error")
-            return
+            summary['error'] = 'Unknown item type'
+            return summary
         
         if tracks:
             # Log download confirmation
             log_progress(download_id, f"Found {len(tracks)} tracks to download", "info")
             log_progress(download_id, f"Ready to download {len(tracks)} tracks to folder: {folder_name}", "info")
             folder_name = sanitize_filename(folder_name)
-            songs_downloader(download_id, folder_name, tracks)
+            summary['folder'] = folder_name
+            summary['tracks'] = len(tracks)
+            summary.update(songs_downloader(download_id, folder_name, tracks, download_folder, audio_format, on_track, executor))
             log_progress(download_id, f"Download completed! Check the '{folder_name}' folder.", "success")
         
         else:
@@ -661,6 +916,9 @@ def download_worker(download_id, spotify_input):
             
     except Exception as e:
         log_progress(download_id, f"Fatal error: {str(e)}", "error")
+        summary['error'] = str(e)
+
+    return summary
 
 @app.route('/api/spotify/info', methods=['GET'])
 def get_spotify_info():
@@ -687,21 +945,21 @@ def get_spotify_info():
                 'tracks_count': len(tracks),
                 'tracks_preview': [{
                     'name': track.name,
-                    'artists': [artist.name for artist in track.artists],
-                    'duration_ms': getattr(track, 'duration_ms', None)
+                    'artists': list(track.artists),
+                    'duration_ms': track.duration_ms
                 } for track in tracks[:5]]  # First 5 tracks as preview
             }
             
         elif item_type == 'album':
             album_info = get_album_info(spotify, item_id)
-            tracks = get_album_tracks(spotify, item_id)
+            tracks = get_album_tracks(spotify, item_id, album_info)
             result = {
                 'item_info': {**album_info, 'type': 'album'},
                 'tracks_count': len(tracks),
                 'tracks_preview': [{
                     'name': track.name,
-                    'artists': [artist.name for artist in track.artists],
-                    'duration_ms': getattr(track, 'duration_ms', None)
+                    'artists': list(track.artists),
+                    'duration_ms': track.duration_ms
                 } for track in tracks[:5]]
             }
             
@@ -728,8 +986,136 @@ def get_spotify_info():
             'error': str(e)
         }), 500
 
-if __name__ == '__main__':
+#########################################################################################
+# Command line interface - headless batch downloads without the HTTP server
+
+class ThroughputMeter(object):
+    """Thread-safe track counter that reports live throughput"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counts = {'downloaded': 0, 'existing': 0, 'failed': 0}
 
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    def __call__(self, status):
+        with self.lock:
+            self.counts[status] += 1
+            done = sum(self.counts.values())
+            elapsed = time.monotonic() - self.started
+            rate = done / elapsed if elapsed > 0 else 0.0
+            print(f"[batch] {done} tracks ({self.counts['downloaded']} downloaded, "
+                  f"{self.counts['existing']} existing, {self.counts['failed']} failed) "
+                  f"- {rate:.2f} tracks/s", file=self.stream, flush=True)
+
+def read_url_list(urls, input_file=None):
+    """Collect Spotify URLs from arguments and a URL list file ('-' reads stdin)"""
+    lines = []
+    if input_file == '-' or (not urls and not input_file and not sys.stdin.isatty()):
+        lines = sys.stdin.read().splitlines()
+    elif input_file:
+        with open(input_file, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    collected = list(urls)
+    for line in lines:
+        line = line.strip()
+        # Skip blank lines and comments
+        if line and not line.startswith('#'):
+            collected.append(line)
+    return collected
+
+def run_batch(urls, workers=1, download_folder=None, audio_format='mp3', progress_stream=None):
+    """Download several Spotify items with up to `workers` tracks at a time and return a JSON-serializable summary"""
+    meter = ThroughputMeter(progress_stream or sys.stderr)
+    # One client (and token) shared by every job in the batch
+    spotify = initialize_spotify_client()
+
+    workers = max(1, workers)
+    clear_ydl_cache()
+
+    # Items fetch their metadata on item_pool, then hand every track to the shared
+    # track_pool, so a single large playlist still downloads `workers` tracks at once.
+    # Separate pools keep item threads waiting on their tracks from starving them.
+    with ThreadPoolExecutor(max_workers=workers) as track_pool:
+        def run_job(url):
+            download_id = str(uuid.uuid4())
+            download_progress[download_id] = []
+            try:
+                return download_worker(download_id, url, download_folder, audio_format, meter, spotify, track_pool)
+            finally:
+                # Nobody polls progress in CLI mode, don't keep the log around
+                download_progress.pop(download_id, None)
+
+        with ThreadPoolExecutor(max_workers=workers) as item_pool:
+            jobs = list(item_pool.map(run_job, urls))
+
+    elapsed = time.monotonic() - meter.started
+    totals = {key: sum(job[key] for job in jobs) for key in ('tracks', 'downloaded', 'existing', 'failed')}
+    return {
+        'success': all(job['error'] is None and job['failed'] == 0 for job in jobs),
+        'jobs': jobs,
+        'totals': totals,
+        'elapsed_seconds': round(elapsed, 2),
+        'tracks_per_second': round((totals['downloaded'] + totals['existing'] + totals['failed']) / elapsed, 3) if elapsed > 0 else 0.0
+    }
+
+def run_download_command(args):
+    """Handle the `download` subcommand, prints a JSON summary and returns the exit code"""
+    try:
+        urls = read_url_list(args.urls, args.input)
+    except OSError as e:
+        print(json.dumps({'success': False, 'error': f'Could not read URL list: {e}'}))
+        return 2
+
+    if not urls:
+        print(json.dumps({'success': False, 'error': 'No Spotify URLs given'}))
+        return 2
+
+    download_folder = None
+    if args.out:
+        download_folder = os.path.abspath(args.out)
+        try:
+            os.makedirs(download_folder, exist_ok=True)
+        except OSError as e:
+            print(json.dumps({'success': False, 'error': f'Could not create output folder: {e}'}))
+            return 2
+
+    try:
+        # Keep stdout for the JSON summary, pipeline logs go to stderr
+        with redirect_stdout(sys.stderr):
+            summary = run_batch(urls, args.workers, download_folder, args.format)
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': f'Batch failed: {str(e)}'}))
+        return 2
+
+    print(json.dumps(summary, indent=2))
+    return 0 if summary['success'] else 1
+
+def main(argv=None):
+    """Run the API server (default) or a headless batch download"""
+    parser = argparse.ArgumentParser(description='Spotify downloader API server and batch CLI')
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help='Run the Flask API server (default)')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=5000)
+
+    download_parser = subparsers.add_parser('download', help='Download Spotify playlists, albums or tracks without the HTTP server')
+    download_parser.add_argument('urls', nargs='*', help='Spotify playlist, album or track URLs')
+    download_parser.add_argument('-i', '--input', help="File with one URL per line ('-' for stdin)")
+    download_parser.add_argument('-w', '--workers', type=int, default=1, help='Number of tracks downloaded in parallel, across all items')
+    download_parser.add_argument('-o', '--out', help='Output directory (defaults to the OS download folder)')
+    download_parser.add_argument('-f', '--format', choices=AUDIO_FORMATS, default='mp3', help='Audio format')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'download':
+        return run_download_command(args)
+
+    app.run(host=getattr(args, 'host', '0.0.0.0'), port=getattr(args, 'port', 5000), debug=False)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
 
 
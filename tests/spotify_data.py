@@ -0,0 +1,28 @@
+"""Spotify API shaped payloads for building tekore models in tests"""
+
+ARTIST = {'id': 'a' * 22, 'name': 'ABBA', 'type': 'artist', 'uri': 'spotify:artist:' + 'a' * 22,
+          'href': 'https://api.spotify.com/v1/artists/a', 'external_urls': {}}
+IMAGES = [{'url': 'https://i.scdn.co/image/large', 'height': 640, 'width': 640},
+          {'url': 'https://i.scdn.co/image/small', 'height': 64, 'width': 64}]
+ALBUM = {'id': 'b' * 22, 'name': 'Gold', 'type': 'album', 'uri': 'spotify:album:' + 'b' * 22,
+         'href': 'https://api.spotify.com/v1/albums/b', 'album_type': 'compilation', 'artists': [ARTIST],
+         'available_markets': ['US'], 'external_urls': {}, 'images': IMAGES, 'release_date': '1992',
+         'release_date_precision': 'year', 'total_tracks': 19}
+SIMPLE_TRACK = {'id': 'c' * 22, 'name': 'SOS', 'type': 'track', 'uri': 'spotify:track:' + 'c' * 22,
+                'href': 'https://api.spotify.com/v1/tracks/c', 'artists': [ARTIST], 'available_markets': ['US'],
+                'disc_number': 1, 'duration_ms': 200000, 'explicit': False,
+                'external_urls': {'spotify': 'https://open.spotify.com/track/' + 'c' * 22}, 'is_local': False,
+                'preview_url': None, 'track_number': 4}
+TRACK = {**SIMPLE_TRACK, 'album': ALBUM, 'external_ids': {'isrc': 'SEAYD7401010'}, 'popularity': 70}
+LOCAL_TRACK = {'id': None, 'href': None, 'name': 'Demo', 'type': 'track', 'uri': 'spotify:local:Band::Demo:180',
+               'album': {'id': None, 'href': None, 'name': 'Tapes', 'type': 'album', 'album_type': None,
+                         'artists': [], 'external_urls': {}, 'images': [], 'release_date': None,
+                         'release_date_precision': None, 'uri': None},
+               'artists': [{'id': None, 'href': None, 'name': 'Band', 'type': 'artist', 'external_urls': {}, 'uri': None}],
+               'disc_number': 0, 'duration_ms': 180000, 'explicit': False, 'external_ids': {}, 'external_urls': {},
+               'is_local': True, 'popularity': 0, 'preview_url': None, 'track_number': 0}
+
+
+def paging(items):
+    return {'href': 'https://api.spotify.com/v1/search', 'items': items, 'limit': 10, 'next': None,
+            'offset': 0, 'previous': None, 'total': len(items)}
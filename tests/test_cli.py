@@ -0,0 +1,193 @@
+import io
+import json
+import threading
+import time
+import types
+
+import pytest
+
+import DownloadPlaylist
+
+
+PLAYLIST_URL = 'https://open.spotify.com/playlist/' + 'A' * 22
+ALBUM_URL = 'https://open.spotify.com/album/' + 'B' * 22
+
+
+def fake_summary(download_id, url, failed=0, error=None):
+    return {
+        'download_id': download_id,
+        'url': url,
+        'folder': 'Playlist - Test',
+        'tracks': 3,
+        'downloaded': 3 - failed,
+        'existing': 0,
+        'failed': failed,
+        'error': error
+    }
+
+
+@pytest.fixture
+def stub_pipeline(monkeypatch):
+    """Replace the Spotify client and download_worker, returns the recorded worker calls"""
+    calls = []
+    monkeypatch.setattr(DownloadPlaylist, 'initialize_spotify_client', lambda: object())
+
+    def fake_worker(download_id, url, download_folder=None, audio_format='mp3', on_track=None, spotify=None, executor=None):
+        calls.append({'url': url, 'download_folder': download_folder, 'audio_format': audio_format, 'executor': executor})
+        for _ in range(3):
+            on_track('downloaded')
+        return fake_summary(download_id, url)
+
+    monkeypatch.setattr(DownloadPlaylist, 'download_worker', fake_worker)
+    return calls
+
+
+def run_cli(capsys, argv):
+    code = DownloadPlaylist.main(argv)
+    out = capsys.readouterr().out
+    return code, json.loads(out)
+
+
+def test_read_url_list_skips_comments_and_blank_lines(tmp_path):
+    url_file = tmp_path / 'urls.txt'
+    url_file.write_text(f'# weekly jobs\n\n  {PLAYLIST_URL}  \n{ALBUM_URL}\n', encoding='utf-8')
+
+    assert DownloadPlaylist.read_url_list(['x'], str(url_file)) == ['x', PLAYLIST_URL, ALBUM_URL]
+
+
+def test_read_url_list_reads_stdin(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO(f'{PLAYLIST_URL}\n# skip\n\n'))
+    assert DownloadPlaylist.read_url_list([], '-') == [PLAYLIST_URL]
+
+
+def test_read_url_list_reads_piped_stdin_without_arguments(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO(f'{ALBUM_URL}\n'))
+    assert DownloadPlaylist.read_url_list([], None) == [ALBUM_URL]
+
+
+def test_download_success_prints_summary_and_exits_0(stub_pipeline, capsys, tmp_path):
+    code, summary = run_cli(capsys, ['download', PLAYLIST_URL, ALBUM_URL, '-w', '2', '-o', str(tmp_path), '-f', 'm4a'])
+
+    assert code == 0
+    assert summary['success'] is True
+    assert set(summary) == {'success', 'jobs', 'totals', 'elapsed_seconds', 'tracks_per_second'}
+    assert [job['url'] for job in summary['jobs']] == [PLAYLIST_URL, ALBUM_URL]
+    assert summary['totals'] == {'tracks': 6, 'downloaded': 6, 'existing': 0, 'failed': 0}
+    assert all(call['download_folder'] == str(tmp_path) for call in stub_pipeline)
+    assert all(call['audio_format'] == 'm4a' for call in stub_pipeline)
+    assert all(call['executor'] is not None for call in stub_pipeline)
+
+
+def test_download_failures_exit_1(stub_pipeline, monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr(DownloadPlaylist, 'download_worker',
+                        lambda download_id, url, *args: fake_summary(download_id, url, failed=1))
+
+    code, summary = run_cli(capsys, ['download', PLAYLIST_URL, '-o', str(tmp_path)])
+
+    assert code == 1
+    assert summary['success'] is False
+    assert summary['totals']['failed'] == 1
+
+
+def test_download_job_error_exits_1(stub_pipeline, monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr(DownloadPlaylist, 'download_worker',
+                        lambda download_id, url, *args: fake_summary(download_id, url, error='Invalid Spotify link'))
+
+    code, summary = run_cli(capsys, ['download', 'not-a-url', '-o', str(tmp_path)])
+
+    assert code == 1
+    assert summary['jobs'][0]['error'] == 'Invalid Spotify link'
+
+
+def test_download_without_urls_exits_2(stub_pipeline, monkeypatch, capsys):
+    monkeypatch.setattr('sys.stdin', io.StringIO(''))
+
+    code, summary = run_cli(capsys, ['download'])
+
+    assert code == 2
+    assert summary == {'success': False, 'error': 'No Spotify URLs given'}
+    assert stub_pipeline == []
+
+
+def test_download_missing_url_file_exits_2(stub_pipeline, capsys, tmp_path):
+    code, summary = run_cli(capsys, ['download', '-i', str(tmp_path / 'missing.txt')])
+
+    assert code == 2
+    assert summary['error'].startswith('Could not read URL list')
+
+
+def test_download_unusable_out_folder_exits_2(stub_pipeline, capsys, tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+
+    code, summary = run_cli(capsys, ['download', PLAYLIST_URL, '-o', str(blocker / 'out')])
+
+    assert code == 2
+    assert summary['error'].startswith('Could not create output folder')
+    assert stub_pipeline == []
+
+
+def test_download_client_failure_exits_2(stub_pipeline, monkeypatch, capsys, tmp_path):
+    def no_credentials():
+        raise ValueError('A client secret is required!')
+    monkeypatch.setattr(DownloadPlaylist, 'initialize_spotify_client', no_credentials)
+
+    code, summary = run_cli(capsys, ['download', PLAYLIST_URL, '-o', str(tmp_path)])
+
+    assert code == 2
+    assert summary == {'success': False, 'error': 'Batch failed: A client secret is required!'}
+
+
+def test_songs_downloader_reports_unwritable_folder_per_track(tmp_path):
+    seen = []
+
+    stats = DownloadPlaylist.songs_downloader('test', 'Folder', [object(), object()],
+                                              download_folder=str(tmp_path / 'missing'), on_track=seen.append)
+
+    assert stats == {'downloaded': 0, 'existing': 0, 'failed': 2}
+    assert seen == ['failed', 'failed']
+
+
+def test_check_permissions_leaves_no_file_in_output_folder(tmp_path):
+    assert DownloadPlaylist.check_permissions(str(tmp_path)) is True
+    assert list(tmp_path.iterdir()) == []
+
+
+class FakeYoutubeDL(object):
+    """Stands in for yt_dlp.YoutubeDL, writes the output file after a short delay"""
+    downloads = []
+    lock = threading.Lock()
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.cache = types.SimpleNamespace(remove=lambda: None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def download(self, queries):
+        with self.lock:
+            self.downloads.append(queries[0])
+        time.sleep(0.1)
+        codec = self.opts['postprocessors'][0]['preferredcodec']
+        with open(self.opts['outtmpl'].replace('%(ext)s', codec), 'w') as f:
+            f.write('audio')
+
+
+def test_duplicate_tracks_download_once_with_workers(monkeypatch, capsys, tmp_path):
+    track = DownloadPlaylist.TrackRecord('c' * 22, 'SOS', ('ABBA',), 'Gold', 'ABBA', None, 200000, 4, 1)
+    fake_yt_dlp = types.SimpleNamespace(YoutubeDL=FakeYoutubeDL, utils=types.SimpleNamespace(DownloadError=Exception))
+    FakeYoutubeDL.downloads = []
+    monkeypatch.setattr(DownloadPlaylist, 'initialize_spotify_client', lambda: object())
+    monkeypatch.setattr(DownloadPlaylist, '_load_download_stack', lambda: (fake_yt_dlp, None))
+    monkeypatch.setattr(DownloadPlaylist, 'get_playlist_info', lambda spotify, item_id: {'name': 'Dupes'})
+    monkeypatch.setattr(DownloadPlaylist, 'get_playlist_tracks', lambda spotify, item_id: [track, track])
+
+    code, summary = run_cli(capsys, ['download', PLAYLIST_URL, '-w', '2', '-o', str(tmp_path), '-f', 'm4a'])
+
+    assert code == 0
+    assert summary['totals'] == {'tracks': 2, 'downloaded': 1, 'existing': 1, 'failed': 0}
+    assert len(FakeYoutubeDL.downloads) == 1
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from tekore.model import FullTrackPaging, SimpleAlbumPaging
+
+import DownloadPlaylist
+from spotify_data import ALBUM, TRACK, paging
+
+
+class FakeSpotify(object):
+    """Answers searches with tekore pagings in Spotify's response order, not the requested one"""
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, types, limit):
+        self.calls += 1
+        # Spotify's documented schema puts tracks before albums and tekore keeps
+        # that order, whatever order was requested
+        pagings = []
+        if 'track' in types:
+            pagings.append(FullTrackPaging(**paging([TRACK])))
+        if 'album' in types:
+            pagings.append(SimpleAlbumPaging(**paging([ALBUM])))
+        return tuple(pagings)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    spotify = FakeSpotify()
+    monkeypatch.setattr(DownloadPlaylist, '_search_client', spotify)
+    monkeypatch.setattr(DownloadPlaylist, 'search_cache', DownloadPlaylist.SearchCache())
+    test_client = DownloadPlaylist.app.test_client()
+    test_client.spotify = spotify
+    return test_client
+
+
+def test_multi_type_search_handles_response_order(client):
+    response = client.get('/api/spotify/search?q=abba&type=album,track')
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [
+        {'id': 'b' * 22, 'name': 'Gold', 'type': 'album', 'artists': ['ABBA'],
+         'image': 'https://i.scdn.co/image/small', 'total_tracks': 19},
+        {'id': 'c' * 22, 'name': 'SOS', 'type': 'track', 'artists': ['ABBA'],
+         'image': 'https://i.scdn.co/image/small', 'total_tracks': None},
+    ]
+
+
+def test_multi_type_search_follows_requested_type_order(client):
+    albums_first = client.get('/api/spotify/search?q=abba&type=album,track').get_json()['results']
+    tracks_first = client.get('/api/spotify/search?q=abba&type=track,album,track').get_json()['results']
+
+    assert [result['type'] for result in albums_first] == ['album', 'track']
+    assert [result['type'] for result in tracks_first] == ['track', 'album']
+    # Both orders are served from the same cache entry
+    assert client.spotify.calls == 1
+
+
+def test_search_is_cached_case_insensitively(client):
+    client.get('/api/spotify/search?q=abba&type=track')
+    response = client.get('/api/spotify/search?q=ABBA&type=track')
+
+    assert response.status_code == 200
+    assert client.spotify.calls == 1
+
+
+def test_search_rejects_unknown_type(client):
+    response = client.get('/api/spotify/search?q=abba&type=show')
+
+    assert response.status_code == 400
+    assert client.spotify.calls == 0
+
+
+def test_interrupted_search_releases_waiters():
+    cache = DownloadPlaylist.SearchCache()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        cache.get_or_compute('key', interrupted)
+
+    assert cache.pending == {}
+    assert cache.get_or_compute('key', lambda: 'fresh') == 'fresh'
+
+
+def test_identical_concurrent_searches_share_one_call_and_waiters_are_bounded():
+    cache = DownloadPlaylist.SearchCache(wait_timeout=0.05)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_compute('key', slow)))
+    owner.start()
+    started.wait(5)
+
+    # A waiter gives up after wait_timeout instead of blocking forever
+    with pytest.raises(TimeoutError):
+        cache.get_or_compute('key', slow)
+
+    release.set()
+    owner.join(5)
+    assert results == ['result']
+    assert cache.get_or_compute('key', slow) == 'result'
+    assert calls == [1]
+
+
+def test_failed_search_is_not_cached():
+    cache = DownloadPlaylist.SearchCache()
+
+    def failing():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('key', failing)
+
+    assert cache.pending == {}
+    assert cache.entries == {}
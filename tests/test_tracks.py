@@ -0,0 +1,71 @@
+from tekore.model import FullTrack, LocalTrack, SimpleTrack, SimpleTrackPaging
+
+import DownloadPlaylist
+from spotify_data import LOCAL_TRACK, SIMPLE_TRACK, TRACK, paging
+
+
+# Keys of the inline track dicts that track_to_dict replaced
+TRACK_DICT_KEYS = {'id', 'name', 'artists', 'artist_names', 'album', 'duration_ms', 'track_number',
+                   'disc_number', 'explicit', 'popularity', 'preview_url', 'external_urls', 'uri', 'type'}
+
+ALBUM_INFO = {'id': 'b' * 22, 'name': 'Gold', 'artists': ['ABBA', 'Benny'], 'release_date': '1992',
+              'total_tracks': 19, 'image': 'https://i.scdn.co/image/album', 'type': 'album'}
+
+
+def test_full_track_record_takes_album_fields_from_track():
+    record = DownloadPlaylist.make_track_record(FullTrack(**TRACK))
+
+    assert record.id == 'c' * 22
+    assert record.name == 'SOS'
+    assert record.artists == ('ABBA',)
+    assert record.album == 'Gold'
+    assert record.album_artist == 'ABBA'
+    assert record.art_url == 'https://i.scdn.co/image/large'
+    assert (record.duration_ms, record.track_number, record.disc_number) == (200000, 4, 1)
+    assert record.popularity == 70
+
+
+def test_album_track_record_takes_album_fields_from_album_info():
+    record = DownloadPlaylist.make_track_record(SimpleTrack(**SIMPLE_TRACK), ALBUM_INFO)
+
+    assert record.album == 'Gold'
+    assert record.album_artist == 'ABBA'
+    assert record.art_url == 'https://i.scdn.co/image/album'
+    assert record.popularity == 0
+
+
+def test_local_track_has_no_external_urls():
+    record = DownloadPlaylist.make_track_record(LocalTrack(**LOCAL_TRACK))
+    track = DownloadPlaylist.track_to_dict(record, 'playlist_track')
+
+    assert record.id is None
+    assert (record.album, record.album_artist, record.art_url) == ('Tapes', None, None)
+    assert track['external_urls'] == {}
+
+
+def test_track_to_dict_keeps_the_response_keys():
+    record = DownloadPlaylist.make_track_record(FullTrack(**TRACK))
+    track = DownloadPlaylist.track_to_dict(record, 'playlist_track')
+
+    assert set(track) == TRACK_DICT_KEYS
+    assert track['artists'] == ['ABBA']
+    assert track['artist_names'] == 'ABBA'
+    assert track['external_urls'] == {'spotify': 'https://open.spotify.com/track/' + 'c' * 22}
+    assert track['uri'] == 'spotify:track:' + 'c' * 22
+    assert track['type'] == 'playlist_track'
+
+
+def test_album_item_route_uses_album_info(monkeypatch):
+    class FakeSpotify(object):
+        def album_tracks(self, album_id):
+            return SimpleTrackPaging(**paging([SIMPLE_TRACK]))
+
+    monkeypatch.setattr(DownloadPlaylist, 'initialize_spotify_client', lambda: FakeSpotify())
+    monkeypatch.setattr(DownloadPlaylist, 'get_album_info', lambda spotify, album_id: ALBUM_INFO)
+
+    response = DownloadPlaylist.app.test_client().get('/api/spotify/item?url=https://open.spotify.com/album/' + 'b' * 22)
+
+    assert response.status_code == 200
+    track, = response.get_json()['tracks']
+    assert set(track) == TRACK_DICT_KEYS
+    assert (track['album'], track['popularity'], track['type']) == ('Gold', 0, 'album_track')